@@ -0,0 +1,47 @@
+import json
+
+# --- BIBLIOTECA DE CABOS ---
+# Parâmetros primários por metro usados por AdvancedTransmissionLine.
+CABLE_LIBRARY = {
+    "Personalizado": {"R_dc": 0.01, "L": 250e-9, "G": 0, "C": 100e-12, "k_skin": 0},
+    "RG-58 (Coaxial 50 Ohms)": {"R_dc": 0.03, "L": 250e-9, "G": 0, "C": 100e-12, "k_skin": 1.5e-4},
+    "RG-59 (Coaxial 75 Ohms)": {"R_dc": 0.05, "L": 370e-9, "G": 0, "C": 67e-12, "k_skin": 1.8e-4},
+    "CAT-5 (Par Trançado)":    {"R_dc": 0.18, "L": 520e-9, "G": 0, "C": 52e-12,  "k_skin": 3.0e-4},
+    "Microstrip (PCB Típico)": {"R_dc": 0.50, "L": 350e-9, "G": 0, "C": 130e-12, "k_skin": 5.0e-4},
+    "Linha Aérea (Alta Tensão)": {"R_dc": 0.05, "L": 1.3e-6, "G": 0, "C": 9e-12, "k_skin": 2.0e-4},
+}
+
+PARAM_NAMES = ("R_dc", "L", "G", "C", "k_skin")
+
+def _cable_params(name, params):
+    """Valida e converte os parâmetros de um cabo (ValueError se inválidos)."""
+    if not isinstance(params, dict):
+        raise ValueError(f"Os parâmetros de '{name}' devem ser um objeto {{nome: valor}}")
+    missing = [k for k in PARAM_NAMES if k not in params]
+    if missing:
+        raise ValueError(f"Parâmetros ausentes para '{name}': {', '.join(missing)}")
+    try:
+        return {k: float(params[k]) for k in PARAM_NAMES}
+    except (TypeError, ValueError):
+        raise ValueError(f"Os parâmetros de '{name}' devem ser numéricos") from None
+
+def add_cable(name, params):
+    """Adiciona (ou substitui) um cabo na biblioteca, ex.: um cabo ajustado a partir de medições."""
+    CABLE_LIBRARY[name] = _cable_params(name, params)
+
+def save_cables(path, names=None):
+    """Salva cabos da biblioteca (todos, ou apenas os nomes dados) em JSON."""
+    names = names if names is not None else list(CABLE_LIBRARY)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({n: CABLE_LIBRARY[n] for n in names}, f, indent=2, ensure_ascii=False)
+
+def load_cables(path):
+    """Carrega cabos de um JSON salvo por save_cables. Retorna os nomes adicionados."""
+    with open(path, encoding="utf-8") as f:
+        cables = json.load(f)
+    if not isinstance(cables, dict):
+        raise ValueError("O arquivo deve conter um objeto JSON {nome do cabo: parâmetros}")
+    # Valida todos antes de alterar a biblioteca (nada é carregado pela metade)
+    cables = {name: _cable_params(name, params) for name, params in cables.items()}
+    CABLE_LIBRARY.update(cables)
+    return list(cables)
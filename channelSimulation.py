@@ -0,0 +1,259 @@
+"""
+Simulação de canal digital (integridade de sinal) com diagrama de olho.
+
+A resposta ao impulso vem da função de transferência linha + carga
+(AdvancedTransmissionLine.compute_transfer). Uma sequência PRBS em NRZ é
+gerada e convoluída em blocos de tamanho fixo (overlap-save via FFT), e o
+diagrama de olho é acumulado incrementalmente em um histograma. Nenhum
+vetor cresce com o número de bits, o que permite simular 10^6-10^8 bits
+com memória constante.
+
+Uso pela linha de comando:
+    python channelSimulation.py --cable "CAT-5 (Par Trançado)" --length 50 --rate 1e9 --bits 1e7
+"""
+import sys
+import argparse
+
+import numpy as np
+
+from physicsEngine import AdvancedTransmissionLine, load_impedance
+from cableLibrary import CABLE_LIBRARY
+
+# Polinômios x^n + x^m + 1 das sequências PRBS usuais (n, m)
+PRBS_TAPS = {7: (7, 6), 9: (9, 5), 11: (11, 9), 15: (15, 14), 23: (23, 18), 31: (31, 28)}
+
+
+class PRBSGenerator:
+    """
+    Gerador PRBS vetorizado: b[k] = b[k-m] XOR b[k-n].
+    Como p(x)^(2^j) = p(x^(2^j)) em GF(2), a sequência também satisfaz
+    b[k] = b[k - m*2^j] XOR b[k - n*2^j], o que permite gerar m*2^j bits
+    de uma só vez a partir do histórico.
+    """
+    MAX_STEP = 1 << 20
+
+    def __init__(self, order=7):
+        if order not in PRBS_TAPS:
+            raise ValueError(f"Ordem PRBS não suportada: {order} (use {sorted(PRBS_TAPS)})")
+        self.n, self.m = PRBS_TAPS[order]
+        self.bits = np.ones(self.n, dtype=np.uint8) # Semente: todos em 1
+        self.pos = 0
+
+    def _extend(self):
+        L = len(self.bits)
+        j = 0
+        while self.n << (j + 1) <= L and self.m << (j + 1) <= self.MAX_STEP:
+            j += 1
+        step, lag = self.m << j, self.n << j
+        new = self.bits[L-step:L] ^ self.bits[L-lag:L-lag+step]
+        self.bits = np.concatenate((self.bits, new))
+
+    def next_bits(self, count):
+        while len(self.bits) - self.pos < count:
+            self._extend()
+        out = self.bits[self.pos:self.pos+count].copy()
+        self.pos += count
+        # Descarta o que já foi lido, mantendo histórico para o maior salto
+        keep_from = min(self.pos, len(self.bits) - 2 * self.n * self.MAX_STEP // self.m)
+        if keep_from > 0:
+            self.bits = self.bits[keep_from:]
+            self.pos -= keep_from
+        return out
+
+
+def channel_impulse_response(line, ZL_func, Z_source, fs, energy_tol=1e-9):
+    """
+    Resposta ao impulso discreta h[k] (amostrada em fs) da linha + carga.
+    ZL_func: função que aceita frequências e retorna Z_L(f)
+    A janela de tempo cobre vários trânsitos da linha (reflexões múltiplas)
+    e h é truncada quando a energia restante cai abaixo de energy_tol.
+    """
+    delay = line.len * np.sqrt(line.L * line.C)
+    n_fft = 1 << int(np.ceil(np.log2(max(4096, 20 * delay * fs))))
+    freqs = np.fft.rfftfreq(n_fft, 1 / fs)
+    # Evita o tratamento especial de DC em compute_params (limite f -> 0)
+    freqs[0] = freqs[1] * 1e-3
+    H = line.compute_transfer(freqs, ZL_func(freqs), Z_source)
+    h = np.fft.irfft(H, n_fft)
+
+    energy = np.cumsum(h**2)
+    n_keep = int(np.searchsorted(energy, energy[-1] * (1 - energy_tol))) + 1
+    return h[:n_keep]
+
+
+class EyeDiagram:
+    """
+    Diagrama de olho acumulado incrementalmente em uma janela de 2 UI.
+    Além do histograma (fase x tensão), guarda por fase o menor valor
+    amostrado com bit central 1 e o maior com bit central 0, de onde saem
+    altura e largura do olho no pior caso observado. Cada amostra entra na
+    janela dos dois bits vizinhos, para que as transições fechem o olho.
+    """
+
+    def __init__(self, samples_per_bit, bit_rate, v_min, v_max, v_bins=256):
+        self.spb = samples_per_bit
+        self.bit_rate = bit_rate
+        self.v_min, self.v_max, self.v_bins = v_min, v_max, v_bins
+        self.histogram = np.zeros((2 * samples_per_bit, v_bins), dtype=np.int64)
+        self.upper_min = np.full(2 * samples_per_bit, np.inf)
+        self.lower_max = np.full(2 * samples_per_bit, -np.inf)
+        self.n_bits = 0
+
+    def accumulate(self, y, offset, bits_left, bits_right):
+        """
+        Adiciona amostras y.
+        offset: posição (amostras) de cada amostra em relação ao cursor do bit 0
+        bits_left / bits_right: bits com centro imediatamente antes / depois da amostra
+        """
+        spb = self.spb
+        scale = self.v_bins / (self.v_max - self.v_min)
+        v_idx = np.clip(((y - self.v_min) * scale).astype(np.int64), 0, self.v_bins - 1)
+        phase = (offset + spb) % (2 * spb)
+        self.histogram += np.bincount(phase * self.v_bins + v_idx,
+                                      minlength=self.histogram.size).reshape(self.histogram.shape)
+        # Janela do bit à esquerda: fases [spb, 2spb); do bit à direita: [0, spb)
+        r = offset % spb
+        for phase, bits in ((r + spb, bits_left), (r, bits_right)):
+            ones = bits == 1
+            np.minimum.at(self.upper_min, phase[ones], y[ones])
+            np.maximum.at(self.lower_max, phase[~ones], y[~ones])
+
+    def opening(self):
+        """
+        Abertura vertical por fase (negativa = olho fechado).
+        Fases em que um dos níveis nunca foi amostrado contam como fechadas.
+        """
+        sampled = np.isfinite(self.upper_min) & np.isfinite(self.lower_max)
+        return np.where(sampled, self.upper_min - self.lower_max, -np.inf)
+
+    def eye_height(self):
+        """Maior abertura vertical (V) e a fase (amostra na janela) onde ocorre."""
+        opening = self.opening()
+        best = int(np.argmax(opening))
+        return max(0.0, float(opening[best])), best
+
+    def eye_width(self):
+        """Largura horizontal (s) da região aberta em torno da melhor fase."""
+        opening = self.opening()
+        height, best = self.eye_height()
+        if height <= 0:
+            return 0.0
+        left = right = best
+        while left > 0 and opening[left - 1] > 0:
+            left -= 1
+        while right < len(opening) - 1 and opening[right + 1] > 0:
+            right += 1
+        return (right - left + 1) / self.spb / self.bit_rate
+
+    def voltages(self):
+        """Centros dos intervalos de tensão do histograma."""
+        edges = np.linspace(self.v_min, self.v_max, self.v_bins + 1)
+        return (edges[:-1] + edges[1:]) / 2
+
+    def times(self):
+        """Instantes (s) das fases da janela de 2 UI, centrada no cursor."""
+        return (np.arange(2 * self.spb) - self.spb) / self.spb / self.bit_rate
+
+
+def simulate_channel(line, ZL_func, bit_rate, n_bits, Z_source=50.0, amplitude=1.0,
+                     samples_per_bit=16, prbs_order=7, v_bins=256, block_fft=1 << 16,
+                     progress=None):
+    """
+    Transmite n_bits de PRBS em NRZ (±amplitude) pela linha e acumula o olho.
+
+    O sinal nunca é materializado: a convolução com h é feita por
+    overlap-save em blocos de FFT de tamanho fixo (>= block_fft).
+    progress: função opcional chamada com a fração concluída (0..1)
+    Retorna: EyeDiagram
+    Levanta ValueError se bit_rate não for positiva e finita, se
+    samples_per_bit < 1 ou se o stream não cobrir o transitório inicial.
+    """
+    if not (np.isfinite(bit_rate) and bit_rate > 0):
+        raise ValueError(f"A taxa de bits deve ser positiva e finita (recebido: {bit_rate})")
+    if samples_per_bit < 1:
+        raise ValueError(f"São necessárias ao menos 1 amostra por bit (recebido: {samples_per_bit})")
+    spb = int(samples_per_bit)
+    fs = bit_rate * spb
+    h = channel_impulse_response(line, ZL_func, Z_source, fs)
+    M = len(h)
+
+    # Resposta a um bit isolado: define o cursor (pico) e o limite de tensão
+    pulse = np.convolve(h, np.ones(spb))
+    # (pelo menos 1 UI, para que o bit seguinte já tenha sido transmitido)
+    cursor = max(int(np.argmax(np.abs(pulse))), spb)
+    warmup = M + cursor # Descarta o transitório inicial (histórico nulo)
+    if n_bits * spb <= warmup:
+        raise ValueError(f"São necessários mais de {warmup // spb} bits para preencher "
+                         f"a resposta do canal (recebido: {n_bits})")
+    padded = np.concatenate((pulse, np.zeros(-len(pulse) % spb)))
+    v_bound = 1.05 * amplitude * np.max(np.sum(np.abs(padded.reshape(-1, spb)), axis=0))
+    eye = EyeDiagram(spb, bit_rate, -v_bound, v_bound, v_bins)
+
+    # Overlap-save: cada bloco produz block_bits * spb amostras válidas
+    n_fft = 1 << int(np.ceil(np.log2(max(block_fft, 4 * M))))
+    block_bits = (n_fft - (M - 1)) // spb
+    H_fft = np.fft.rfft(h, n_fft)
+    x_tail = np.zeros(M - 1)
+
+    # Bits guardados para decidir amostras atrasadas de até 'cursor' amostras
+    hist_bits = cursor // spb + 2
+    bit_buf = np.zeros(0, dtype=np.uint8)
+    j_base = 0 # Índice (global) do primeiro bit em bit_buf
+
+    prbs = PRBSGenerator(prbs_order)
+    sent = 0
+    while sent < n_bits:
+        nb = min(block_bits, n_bits - sent)
+        bits = prbs.next_bits(nb)
+        x = amplitude * (2.0 * np.repeat(bits, spb) - 1.0)
+        buf = np.concatenate((x_tail, x))
+        y = np.fft.irfft(np.fft.rfft(buf, n_fft) * H_fft, n_fft)[M-1:M-1+len(x)]
+        x_tail = buf[len(buf)-(M-1):]
+
+        bit_buf = np.concatenate((bit_buf, bits))
+        g = sent * spb + np.arange(len(x))
+        valid = g >= warmup
+        if np.any(valid):
+            g, y = g[valid], y[valid]
+            offset = g - cursor
+            j = offset // spb - j_base # Bit com centro imediatamente antes
+            eye.accumulate(y, offset, bit_buf[j], bit_buf[j + 1])
+
+        sent += nb
+        eye.n_bits = sent
+        drop = max(0, len(bit_buf) - hist_bits)
+        bit_buf = bit_buf[drop:]
+        j_base += drop
+        if progress is not None:
+            progress(sent / n_bits)
+
+    return eye
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulação de canal PRBS com diagrama de olho.")
+    parser.add_argument("--cable", default="CAT-5 (Par Trançado)", choices=list(CABLE_LIBRARY))
+    parser.add_argument("--length", type=float, default=10.0, help="Comprimento (m)")
+    parser.add_argument("--rate", type=float, default=1e9, help="Taxa de bits (bit/s)")
+    parser.add_argument("--bits", type=float, default=1e6, help="Número de bits")
+    parser.add_argument("--load", type=float, default=100.0, help="Carga resistiva (Ω)")
+    parser.add_argument("--source", type=float, default=100.0, help="Impedância da fonte (Ω)")
+    parser.add_argument("--prbs", type=int, default=7, choices=sorted(PRBS_TAPS))
+    parser.add_argument("--spb", type=int, default=16, help="Amostras por bit")
+    args = parser.parse_args(argv)
+
+    p = CABLE_LIBRARY[args.cable]
+    line = AdvancedTransmissionLine(p['R_dc'], p['L'], p['G'], p['C'], args.length, p['k_skin'])
+    ZL_func = lambda f: load_impedance("Constante (Z)", f, args.load)
+    try:
+        eye = simulate_channel(line, ZL_func, args.rate, int(args.bits), args.source,
+                               samples_per_bit=args.spb, prbs_order=args.prbs)
+    except ValueError as e:
+        parser.error(str(e))
+    height, _ = eye.eye_height()
+    print(f"{eye.n_bits} bits | altura do olho: {height*1e3:.1f} mV | "
+          f"largura do olho: {eye.eye_width()*1e12:.0f} ps")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Exportação headless de figuras em lote (relatórios).
+
+Renderiza as visualizações de Ondas, Carta de Smith, Sweep e Desenho
+Esquemático para uma lista de configurações, sem abrir a interface.
+Os gráficos usam o backend Agg do matplotlib e o esquemático usa a
+plataforma "offscreen" do Qt. O trabalho é distribuído em um pool de
+processos; cada processo reaproveita as mesmas figuras (e a grade estática
+da Carta de Smith) entre os quadros.
+
+Uso pela linha de comando:
+    python exportPipeline.py configs.json saida/ --formats png svg --dpi 200
+
+Cada configuração é um dict (ou objeto JSON) com as chaves:
+    name       : prefixo dos arquivos (opcional)
+    cable      : nome em CABLE_LIBRARY (ou "cable_params" com R_dc/L/G/C/k_skin)
+    length     : comprimento da linha (m)
+    freq       : frequência de operação (Hz)
+    load_type  : "Constante (Z)", "RLC Série" ou "RLC Paralelo"
+    zl         : carga constante, complex ou [real, imag]
+    rlc        : {"R": ..., "L": ..., "C": ...}
+    sweep      : [f_inicial, f_final, pontos] (opcional)
+    views      : subconjunto de VIEWS (opcional, padrão: todas)
+"""
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from physicsEngine import AdvancedTransmissionLine, load_impedance
+from smithChart import draw_smith_chart_background
+from cableLibrary import CABLE_LIBRARY
+from plotViews import plot_standing_wave, plot_smith_trajectory, plot_frequency_sweep, remove_artists
+
+VIEWS = ("schematic", "wave", "smith", "sweep")
+FORMATS = ("png", "svg", "pdf")
+
+DEFAULT_CONFIG = {
+    "cable": "RG-58 (Coaxial 50 Ohms)",
+    "length": 2.0,
+    "freq": 100e6,
+    "load_type": "Constante (Z)",
+    "zl": 100 - 50j,
+    "rlc": {"R": 50.0, "L": 100e-9, "C": 10e-12},
+    "sweep": (1e6, 500e6, 300),
+}
+
+# Tamanho das figuras em polegadas (o tamanho em pixels vem do DPI)
+FIG_SIZE = (8, 6)
+SCHEMATIC_SIZE = (900, 450)
+
+# Estado por processo: figuras reaproveitadas entre quadros
+_figures = {}
+_smith_artists = []
+
+
+def _init_worker():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def _get_figure(view):
+    """Cria (uma única vez por processo) a figura Agg de uma visualização."""
+    if view not in _figures:
+        fig = Figure(figsize=FIG_SIZE)
+        FigureCanvasAgg(fig)
+        if view == "sweep":
+            axes = (fig.add_subplot(211), fig.add_subplot(212))
+            fig.subplots_adjust(hspace=0.4)
+        else:
+            axes = (fig.add_subplot(111),)
+        if view == "smith":
+            # A grade é estática: desenhada uma vez e mantida entre os quadros
+            draw_smith_chart_background(axes[0])
+        _figures[view] = (fig, axes)
+    return _figures[view]
+
+
+def _parse_complex(value):
+    if isinstance(value, (list, tuple)):
+        return complex(value[0], value[1])
+    return complex(value)
+
+
+def solve_config(config):
+    """
+    Resolve a física de uma configuração (mesmas equações da interface).
+    Retorna um dict com o nome do cabo, gamma, Gamma_L, |Γ| e a varredura de Zin(f).
+    """
+    cfg = dict(DEFAULT_CONFIG)
+    cfg.update(config)
+    p = cfg.get("cable_params") or CABLE_LIBRARY[cfg["cable"]]
+    # Rótulo do esquemático: o cabo pedido, não o padrão mesclado
+    cable_name = config.get("cable") or ("Personalizado" if cfg.get("cable_params") else cfg["cable"])
+    line = AdvancedTransmissionLine(p['R_dc'], p['L'], p['G'], p['C'], cfg["length"], p['k_skin'])
+    zl = _parse_complex(cfg["zl"])
+
+    f_arr = np.array([cfg["freq"]], dtype=float)
+    ZL = load_impedance(cfg["load_type"], f_arr, zl, cfg["rlc"])[0]
+    Z0_vec, gamma_vec, _ = line.compute_zin(f_arr, ZL)
+    Z0, gamma = Z0_vec[0], gamma_vec[0]
+    Gamma_L = (ZL - Z0) / (ZL + Z0)
+
+    f_start, f_stop, n_points = cfg["sweep"]
+    freqs = np.linspace(f_start, f_stop, int(n_points))
+    ZL_vec = load_impedance(cfg["load_type"], freqs, zl, cfg["rlc"])
+    _, _, Zin_vec = line.compute_zin(freqs, ZL_vec)
+
+    return {
+        "cfg": cfg,
+        "cable_name": cable_name,
+        "gamma": gamma,
+        "Gamma_L": Gamma_L,
+        "abs_gamma": abs(Gamma_L),
+        "freqs": freqs,
+        "Zin": Zin_vec,
+    }
+
+
+def _render_plot(view, result, path, fmt, dpi):
+    global _smith_artists
+    fig, axes = _get_figure(view)
+    cfg = result["cfg"]
+    if view == "wave":
+        plot_standing_wave(axes[0], cfg["length"], cfg["freq"], result["gamma"], result["Gamma_L"])
+    elif view == "smith":
+        # Remove apenas a trajetória anterior; a grade permanece
+        remove_artists(_smith_artists)
+        _smith_artists = plot_smith_trajectory(axes[0], cfg["length"], result["gamma"], result["Gamma_L"])
+    elif view == "sweep":
+        plot_frequency_sweep(axes[0], axes[1], result["freqs"], result["Zin"], cfg["freq"])
+    fig.savefig(path, format=fmt, dpi=dpi)
+
+
+def _render_schematic(result, path, fmt, dpi):
+    # Import tardio: o Qt só é carregado se o esquemático for pedido
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtGui import QImage, QPainter, QPdfWriter, QPageSize, QColor
+    from PyQt6.QtCore import QSize, QSizeF, QRect
+    from schematicView import CircuitSchematic
+
+    app = QApplication.instance() or QApplication([])
+    if "schematic" not in _figures:
+        widget = CircuitSchematic()
+        widget.timer.stop() # Animação não faz sentido em imagem estática
+        widget.resize(*SCHEMATIC_SIZE)
+        _figures["schematic"] = (app, widget)
+    widget = _figures["schematic"][1]
+
+    cfg = result["cfg"]
+    widget.update_schematic(result["cable_name"], cfg["length"], cfg["load_type"], result["abs_gamma"])
+    w, h = SCHEMATIC_SIZE
+    scale = dpi / 96.0 # Qt desenha em pixels lógicos de 96 DPI
+
+    if fmt == "png":
+        image = QImage(int(w * scale), int(h * scale), QImage.Format.Format_ARGB32)
+        image.fill(QColor("white"))
+        image.setDotsPerMeterX(int(dpi / 0.0254))
+        image.setDotsPerMeterY(int(dpi / 0.0254))
+        painter = QPainter(image)
+        painter.scale(scale, scale)
+        widget.render(painter)
+        painter.end()
+        image.save(path, "PNG")
+    elif fmt == "svg":
+        from PyQt6.QtSvg import QSvgGenerator
+        generator = QSvgGenerator()
+        generator.setFileName(path)
+        generator.setSize(QSize(w, h))
+        generator.setViewBox(QRect(0, 0, w, h))
+        generator.setResolution(int(dpi))
+        painter = QPainter(generator)
+        widget.render(painter)
+        painter.end()
+    elif fmt == "pdf":
+        writer = QPdfWriter(path)
+        writer.setResolution(int(dpi))
+        writer.setPageSize(QPageSize(QSizeF(w * 72 / 96, h * 72 / 96), QPageSize.Unit.Point))
+        painter = QPainter(writer)
+        painter.scale(writer.width() / w, writer.height() / h)
+        widget.render(painter)
+        painter.end()
+
+
+def render_config(index_config, out_dir, formats, dpi):
+    """Renderiza todas as visualizações pedidas de uma configuração."""
+    index, config = index_config
+    result = solve_config(config)
+    name = config.get("name", f"config_{index:05d}")
+    views = config.get("views", VIEWS)
+
+    paths = []
+    for view in views:
+        for fmt in formats:
+            path = os.path.join(out_dir, f"{name}_{view}.{fmt}")
+            if view == "schematic":
+                _render_schematic(result, path, fmt, dpi)
+            else:
+                _render_plot(view, result, path, fmt, dpi)
+            paths.append(path)
+    return paths
+
+
+def export_report_pack(configs, out_dir, formats=("png",), dpi=150, workers=None, chunksize=None):
+    """
+    Exporta as figuras de todas as configurações em paralelo.
+    Retorna a lista de arquivos gerados, na ordem das configurações.
+    """
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato não suportado: {fmt} (use {', '.join(FORMATS)})")
+    for config in configs:
+        for view in config.get("views", VIEWS):
+            if view not in VIEWS:
+                raise ValueError(f"Visualização desconhecida: {view} (use {', '.join(VIEWS)})")
+    os.makedirs(out_dir, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        # Lotes grandes o bastante para diluir o custo de IPC,
+        # pequenos o bastante para balancear a carga entre processos
+        chunksize = max(1, len(configs) // (workers * 4))
+
+    job = partial(render_config, out_dir=out_dir, formats=tuple(formats), dpi=dpi)
+    # "spawn" evita herdar estado do Qt/matplotlib do processo pai via fork
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker) as pool:
+        results = pool.map(job, enumerate(configs), chunksize=chunksize)
+        return [path for paths in results for path in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportação headless de figuras do simulador.")
+    parser.add_argument("configs", help="Arquivo JSON com a lista de configurações")
+    parser.add_argument("out_dir", help="Diretório de saída")
+    parser.add_argument("--formats", nargs="+", default=["png"], choices=FORMATS)
+    parser.add_argument("--dpi", type=float, default=150)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with open(args.configs, encoding="utf-8") as f:
+        configs = json.load(f)
+    paths = export_report_pack(configs, args.out_dir, args.formats, args.dpi, args.workers)
+    print(f"{len(paths)} arquivos exportados em {args.out_dir}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
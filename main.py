@@ -1,3 +1,4 @@
+import os
 import sys
 import numpy as np
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, 
@@ -9,19 +10,16 @@ from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
 # --- IMPORTS DOS NOSSOS MÓDULOS ---
-from physicsEngine import AdvancedTransmissionLine
+from physicsEngine import AdvancedTransmissionLine, load_impedance
 from smithChart import draw_smith_chart_background
 from schematicView import CircuitSchematic
+from cableLibrary import CABLE_LIBRARY, load_cables
+from plotViews import (plot_standing_wave, plot_smith_trajectory, plot_frequency_sweep,
+                       plot_distance_to_fault, plot_eye_diagram)
+from faultLocator import (WINDOWS, C_LIGHT, velocity_factor, unambiguous_range,
+                          reflection_from_zin, read_touchstone, distance_to_fault)
+from channelSimulation import simulate_channel
 
-# --- BIBLIOTECA DE CABOS ---
-CABLE_LIBRARY = {
-    "Personalizado": {"R_dc": 0.01, "L": 250e-9, "G": 0, "C": 100e-12, "k_skin": 0},
-    "RG-58 (Coaxial 50 Ohms)": {"R_dc": 0.03, "L": 250e-9, "G": 0, "C": 100e-12, "k_skin": 1.5e-4},
-    "RG-59 (Coaxial 75 Ohms)": {"R_dc": 0.05, "L": 370e-9, "G": 0, "C": 67e-12, "k_skin": 1.8e-4},
-    "CAT-5 (Par Trançado)":    {"R_dc": 0.18, "L": 520e-9, "G": 0, "C": 52e-12,  "k_skin": 3.0e-4},
-    "Microstrip (PCB Típico)": {"R_dc": 0.50, "L": 350e-9, "G": 0, "C": 130e-12, "k_skin": 5.0e-4},
-    "Linha Aérea (Alta Tensão)": {"R_dc": 0.05, "L": 1.3e-6, "G": 0, "C": 9e-12, "k_skin": 2.0e-4},
-}
 
 class MainApp(QMainWindow):
     def __init__(self):
@@ -36,6 +34,7 @@ class MainApp(QMainWindow):
         self.load_type = "Constante (Z)"
         self.zl_const = 100 - 50j
         self.rlc_params = {"R": 50.0, "L": 100e-9, "C": 10e-12}
+        self.dtf_measurement = None # (freqs, S11, Z_ref) importado de Touchstone
 
         # --- LAYOUT PRINCIPAL ---
         central_widget = QWidget()
@@ -61,12 +60,14 @@ class MainApp(QMainWindow):
             "Ondas Estacionárias",    # Index 1
             "Carta de Smith",         # Index 2
             "Análise Espectral",      # Index 3
-            "Exportar Imagem (PNG)"   # Index 4 (Ação)
+            "Distância até Falha",    # Index 4
+            "Diagrama de Olho",       # Index 5
+            "Exportar Imagem (PNG)"   # Index 6 (Ação)
         ])
         self.list_nav.setCurrentRow(0)
         
-        # Aumentei altura para caber 5 itens sem scroll (35px * 5 ≈ 175)
-        self.list_nav.setFixedHeight(180) 
+        # Altura para caber 7 itens sem scroll (35px * 7 ≈ 245)
+        self.list_nav.setFixedHeight(250) 
         self.list_nav.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         
         self.list_nav.setStyleSheet("""
@@ -103,6 +104,9 @@ class MainApp(QMainWindow):
         self.combo_cables.setCurrentText("RG-58 (Coaxial 50 Ohms)")
         self.combo_cables.currentTextChanged.connect(self.on_cable_changed)
         layout_cables.addWidget(self.combo_cables)
+        btn_load_cables = QPushButton("Carregar Cabos Ajustados")
+        btn_load_cables.clicked.connect(self.load_fitted_cables)
+        layout_cables.addWidget(btn_load_cables)
         group_cables.setLayout(layout_cables)
         layout_left.addWidget(group_cables)
 
@@ -207,11 +211,15 @@ class MainApp(QMainWindow):
         self.view_wave = QWidget(); self.setup_tab(self.view_wave, "Ondas")
         self.view_smith = QWidget(); self.setup_tab(self.view_smith, "Smith")
         self.view_sweep = QWidget(); self.setup_tab(self.view_sweep, "Sweep")
+        self.view_dtf = QWidget(); self.setup_tab(self.view_dtf, "DTF")
+        self.view_eye = QWidget(); self.setup_tab(self.view_eye, "Olho")
         
         self.stack_views.addWidget(self.view_schematic) # 0
         self.stack_views.addWidget(self.view_wave)      # 1
         self.stack_views.addWidget(self.view_smith)     # 2
         self.stack_views.addWidget(self.view_sweep)     # 3
+        self.stack_views.addWidget(self.view_dtf)       # 4
+        self.stack_views.addWidget(self.view_eye)       # 5
         
         draw_smith_chart_background(self.ax_smith)
         self.on_load_update() 
@@ -231,14 +239,42 @@ class MainApp(QMainWindow):
             self.ax_sweep_mag = fig.add_subplot(211)
             self.ax_sweep_phase = fig.add_subplot(212)
             fig.subplots_adjust(hspace=0.4)
+        elif type_name == "DTF":
+            self.fig_dtf = fig; self.canvas_dtf = canvas; self.ax_dtf = fig.add_subplot(111)
+            # Controles: janela e fonte dos dados (simulação ou Touchstone)
+            layout_ctrl = QHBoxLayout()
+            self.combo_dtf_window = QComboBox()
+            self.combo_dtf_window.addItems(WINDOWS.keys())
+            self.combo_dtf_window.setCurrentText("Hann")
+            self.combo_dtf_window.currentTextChanged.connect(self.update_distance_to_fault)
+            btn_import = QPushButton("Importar Touchstone")
+            btn_import.clicked.connect(self.import_touchstone)
+            btn_sim = QPushButton("Usar Simulação")
+            btn_sim.clicked.connect(self.use_simulated_dtf)
+            self.lbl_dtf_source = QLabel("Fonte: simulação")
+            layout_ctrl.addWidget(QLabel("Janela:")); layout_ctrl.addWidget(self.combo_dtf_window)
+            layout_ctrl.addWidget(btn_import); layout_ctrl.addWidget(btn_sim)
+            layout_ctrl.addWidget(self.lbl_dtf_source); layout_ctrl.addStretch()
+            layout.insertLayout(0, layout_ctrl)
+        elif type_name == "Olho":
+            self.fig_eye = fig; self.canvas_eye = canvas; self.ax_eye = fig.add_subplot(111)
+            # Simulação sob demanda: streams longos levam alguns segundos
+            layout_ctrl = QHBoxLayout()
+            self.in_bit_rate = QLineEdit("1e9"); self.in_n_bits = QLineEdit("1e5")
+            btn_eye = QPushButton("Simular Canal")
+            btn_eye.clicked.connect(self.run_channel_simulation)
+            layout_ctrl.addWidget(QLabel("Taxa (bit/s):")); layout_ctrl.addWidget(self.in_bit_rate)
+            layout_ctrl.addWidget(QLabel("Bits:")); layout_ctrl.addWidget(self.in_n_bits)
+            layout_ctrl.addWidget(btn_eye); layout_ctrl.addStretch()
+            layout.insertLayout(0, layout_ctrl)
 
     # --- LÓGICA DE NAVEGAÇÃO ---
     def change_view(self, row):
-        # Indices 0 a 3 são visualizações reais
-        if row <= 3:
+        # Indices 0 a 5 são visualizações reais
+        if row < self.stack_views.count():
             self.stack_views.setCurrentIndex(row)
         else:
-            # Index 4 é o botão de EXPORTAR
+            # Último item é o botão de EXPORTAR
             self.export_current_view()
             
             # Truque de UX: Retorna a seleção para a aba que estava antes
@@ -260,32 +296,17 @@ class MainApp(QMainWindow):
 
     # --- LÓGICA DE NEGÓCIO ---
     def get_load_impedance(self, freqs):
-        omega = 2 * np.pi * freqs
-        if self.load_type == "Constante (Z)":
-            return np.full_like(freqs, self.zl_const, dtype=complex)
-        elif self.load_type == "RLC Série":
-            R, L, C = self.rlc_params["R"], self.rlc_params["L"], self.rlc_params["C"]
-            Xc = np.divide(1.0, (omega * C), out=np.zeros_like(omega), where=omega!=0)
-            return R + 1j * (omega * L - Xc)
-        elif self.load_type == "RLC Paralelo":
-            R, L, C = self.rlc_params["R"], self.rlc_params["L"], self.rlc_params["C"]
-            G = 1.0 / R
-            Bl = np.divide(1.0, (omega * L), out=np.zeros_like(omega), where=omega!=0)
-            Bc = omega * C
-            Y = G + 1j * (Bc - Bl)
-            return np.divide(1.0, Y, out=np.full_like(Y, 1e9), where=Y!=0)
+        return load_impedance(self.load_type, freqs, self.zl_const, self.rlc_params)
 
     def calculate_physics(self):
         p = self.cable_params
         line = AdvancedTransmissionLine(p['R_dc'], p['L'], p['G'], p['C'], self.current_len, p['k_skin'])
         
         f_arr = np.array([self.current_freq])
-        Z0_vec, gamma_vec = line.compute_params(f_arr)
-        Z0, gamma = Z0_vec[0], gamma_vec[0]
         ZL = self.get_load_impedance(f_arr)[0]
+        Z0_vec, gamma_vec, Zin_vec = line.compute_zin(f_arr, ZL)
+        Z0, gamma, Zin = Z0_vec[0], gamma_vec[0], Zin_vec[0]
         
-        term = np.tanh(gamma * self.current_len)
-        Zin = Z0 * (ZL + Z0 * term) / (Z0 + ZL * term)
         Gamma_L = (ZL - Z0) / (ZL + Z0)
         
         abs_gamma = abs(Gamma_L)
@@ -305,58 +326,92 @@ class MainApp(QMainWindow):
         self.schematic.update_schematic(self.combo_cables.currentText(), self.current_len, self.load_type, abs_gamma)
         
         # Plot Ondas
-        x = np.linspace(0, self.current_len, 200)
-        d = self.current_len - x
-        V_d = np.exp(gamma * d) + Gamma_L * np.exp(-gamma * d)
-        
-        self.ax_wave.clear()
-        self.ax_wave.plot(x, np.abs(V_d), color='#0055aa', linewidth=2)
-        self.ax_wave.set_title(f"Tensão ao longo da linha (f={self.current_freq/1e6:.0f} MHz)")
-        self.ax_wave.set_xlabel("Distância da Fonte (m)")
-        self.ax_wave.set_ylabel("|V| Normalizado")
-        self.ax_wave.grid(True, linestyle='--', alpha=0.5)
+        plot_standing_wave(self.ax_wave, self.current_len, self.current_freq, gamma, Gamma_L)
         self.canvas_wave.draw()
         
         # Plot Smith
         self.ax_smith.clear()
         draw_smith_chart_background(self.ax_smith)
-        dist_sweep = np.linspace(0, self.current_len, 100)
-        Gamma_d = Gamma_L * np.exp(-2 * gamma * dist_sweep)
-        self.ax_smith.plot(Gamma_d.real, Gamma_d.imag, 'r-', lw=2, label='Trajetória')
-        self.ax_smith.plot(Gamma_d[0].real, Gamma_d[0].imag, 'go', label='Carga')
-        self.ax_smith.plot(Gamma_d[-1].real, Gamma_d[-1].imag, 'bo', label='Entrada')
-        self.ax_smith.legend(fontsize='small')
+        plot_smith_trajectory(self.ax_smith, self.current_len, gamma, Gamma_L)
         self.canvas_smith.draw()
         
         self.update_frequency_sweep()
+        self.update_distance_to_fault()
 
     def update_frequency_sweep(self):
         freqs = np.linspace(1e6, 500e6, 300)
         p = self.cable_params
         line = AdvancedTransmissionLine(p['R_dc'], p['L'], p['G'], p['C'], self.current_len, p['k_skin'])
-        Z0_vec, gamma_vec = line.compute_params(freqs)
         ZL_vec = self.get_load_impedance(freqs)
+        _, _, Zin_vec = line.compute_zin(freqs, ZL_vec)
         
-        term = np.tanh(gamma_vec * self.current_len)
-        Zin_vec = Z0_vec * (ZL_vec + Z0_vec * term) / (Z0_vec + ZL_vec * term)
-        
-        mag = np.abs(Zin_vec)
-        phase = np.angle(Zin_vec, deg=True)
-        
-        self.ax_sweep_mag.clear()
-        self.ax_sweep_mag.plot(freqs/1e6, mag, 'k-', lw=1.5)
-        self.ax_sweep_mag.set_ylabel("|Zin| (Ω)")
-        self.ax_sweep_mag.grid(True, alpha=0.5)
-        
-        self.ax_sweep_phase.clear()
-        self.ax_sweep_phase.plot(freqs/1e6, phase, 'r-', lw=1.5)
-        self.ax_sweep_phase.set_ylabel("Fase (°)")
-        self.ax_sweep_phase.set_xlabel("Freq (MHz)")
-        self.ax_sweep_phase.grid(True, alpha=0.5)
-        
-        self.ax_sweep_mag.axvline(self.current_freq/1e6, color='b', linestyle='--')
+        plot_frequency_sweep(self.ax_sweep_mag, self.ax_sweep_phase, freqs, Zin_vec, self.current_freq)
         self.canvas_sweep.draw()
 
+    def update_distance_to_fault(self):
+        p = self.cable_params
+        line = AdvancedTransmissionLine(p['R_dc'], p['L'], p['G'], p['C'], self.current_len, p['k_skin'])
+        vf = velocity_factor(p['L'], p['C'])
+        
+        if self.dtf_measurement is None:
+            # Varredura simulada com df pequeno o bastante para ver até 2x o
+            # comprimento sem aliasing: v_p / (2 df) >= 2 * comprimento
+            f_start, f_stop = 1e6, 500e6
+            points = int((f_stop - f_start) * 4 * self.current_len / (vf * C_LIGHT)) + 1
+            freqs = np.linspace(f_start, f_stop, min(100000, max(300, points)))
+            _, _, Zin_vec = line.compute_zin(freqs, self.get_load_impedance(freqs))
+            S11 = reflection_from_zin(Zin_vec, np.sqrt(p['L'] / p['C']))
+            d_stop, line_end = 1.5 * self.current_len, self.current_len
+        else:
+            freqs, S11, _ = self.dtf_measurement
+            d_stop, line_end = unambiguous_range(freqs, vf), None
+        
+        distances, mag = distance_to_fault(freqs, S11, line, 0, d_stop, 2048, self.combo_dtf_window.currentText())
+        plot_distance_to_fault(self.ax_dtf, distances, mag, line_end)
+        self.canvas_dtf.draw()
+
+    def import_touchstone(self):
+        filename, _ = QFileDialog.getOpenFileName(self, "Importar Medição", "", "Touchstone (*.s1p *.s2p)")
+        if not filename:
+            return
+        try:
+            self.dtf_measurement = read_touchstone(filename)
+            self.update_distance_to_fault()
+            self.lbl_dtf_source.setText(f"Fonte: {os.path.basename(filename)}")
+        except (OSError, ValueError) as e:
+            self.dtf_measurement = None
+            self.update_distance_to_fault()
+            QMessageBox.warning(self, "Erro", f"Não foi possível usar o arquivo:\n{e}")
+
+    def use_simulated_dtf(self):
+        self.dtf_measurement = None
+        self.lbl_dtf_source.setText("Fonte: simulação")
+        self.update_distance_to_fault()
+
+    def run_channel_simulation(self):
+        try:
+            bit_rate = float(self.in_bit_rate.text())
+            n_bits = int(float(self.in_n_bits.text()))
+        except (ValueError, OverflowError): # Texto inválido ou "inf"
+            return
+        p = self.cable_params
+        line = AdvancedTransmissionLine(p['R_dc'], p['L'], p['G'], p['C'], self.current_len, p['k_skin'])
+        # Driver casado com a impedância nominal da linha
+        Z_source = np.sqrt(p['L'] / p['C'])
+        # processEvents mantém a janela responsiva; bloqueia os controles para
+        # que nenhum clique inicie outra simulação ou mude a linha no meio
+        self.centralWidget().setEnabled(False)
+        try:
+            eye = simulate_channel(line, self.get_load_impedance, bit_rate, n_bits, Z_source,
+                                   progress=lambda _: QApplication.processEvents())
+        except ValueError as e:
+            QMessageBox.warning(self, "Erro", f"Não foi possível simular o canal:\n{e}")
+            return
+        finally:
+            self.centralWidget().setEnabled(True)
+        plot_eye_diagram(self.ax_eye, eye)
+        self.canvas_eye.draw()
+
     def calculate_stub_match(self):
         freq = self.current_freq
         w_len = 3e8 / freq 
@@ -404,6 +459,21 @@ class MainApp(QMainWindow):
     def on_cable_changed(self, text):
         self.cable_params = CABLE_LIBRARY[text]
         self.calculate_physics()
+    def load_fitted_cables(self):
+        # Cabos gerados por parameterFitting.py (JSON)
+        filename, _ = QFileDialog.getOpenFileName(self, "Carregar Cabos", "", "JSON (*.json)")
+        if not filename:
+            return
+        try:
+            names = load_cables(filename)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Erro", f"Não foi possível carregar os cabos:\n{e}")
+            return
+        for name in names:
+            if self.combo_cables.findText(name) < 0:
+                self.combo_cables.addItem(name)
+        if names:
+            self.combo_cables.setCurrentText(names[0])
     def on_freq_changed(self):
         self.current_freq = self.slider_freq.value() * 1e6 
         self.lbl_freq.setText(f"Freq: {self.current_freq/1e6:.1f} MHz")
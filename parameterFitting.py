@@ -0,0 +1,322 @@
+"""
+Extração dos parâmetros primários (R_dc, L, G, C, k_skin) de um cabo a
+partir de varreduras medidas de Zin(f) ou S11(f).
+
+Ajuste por mínimos quadrados não linear (Levenberg-Marquardt) usando o
+Jacobiano analítico e vetorizado da expressão de Zin do
+AdvancedTransmissionLine. Cada lote é ajustado a partir de vários pontos
+iniciais (multi-start), com continuação em frequência, e todos os ajustes
+(lotes x partidas) são distribuídos em um pool de processos.
+
+Uso pela linha de comando (um cabo por arquivo Touchstone):
+    python parameterFitting.py lote*.s1p --length 10 --load open --out cabos.json
+"""
+import os
+import sys
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cableLibrary import CABLE_LIBRARY, PARAM_NAMES, add_cable, save_cables
+
+# L e C são sempre positivos e variam por décadas: ajustados em escala log.
+# R_dc, G e k_skin podem ser nulos: ajustados em escala linear (>= 0).
+LOG_PARAMS = ("L", "C")
+# Escalas típicas dos parâmetros lineares (normalização do problema)
+LINEAR_SCALES = {"R_dc": 0.1, "G": 1e-5, "k_skin": 1e-4}
+
+
+def zin_from_s11(S11, Z_ref=50.0):
+    """Converte coeficiente de reflexão medido em impedância de entrada."""
+    return Z_ref * (1 + S11) / (1 - S11)
+
+
+def zin_jacobian(params, freqs, length, ZL=None):
+    """
+    Zin(f) e suas derivadas em relação a (R_dc, L, G, C, k_skin).
+    ZL: impedância da carga (escalar ou array); None = linha em aberto.
+    Retorna: Zin (N,), J (N, 5) complexos
+    """
+    R_dc, L, G, C, k_skin = params
+    omega = 2 * np.pi * freqs
+    sqrt_f = np.sqrt(freqs)
+
+    # Mesmo modelo de compute_params (efeito pelicular em R)
+    Z = R_dc + k_skin * sqrt_f + 1j * omega * L
+    Y = G + 1j * omega * C
+    Z0 = np.sqrt(Z / Y)
+    gamma = np.sqrt(Z * Y)
+    t = np.tanh(gamma * length)
+
+    if ZL is None:
+        Zin = Z0 / t
+        dZin_dZ0 = 1 / t
+        dZin_dt = -Z0 / t**2
+    else:
+        N = ZL + Z0 * t
+        D = Z0 + ZL * t
+        Zin = Z0 * N / D
+        dZin_dZ0 = N / D + Z0 * (t * D - N) / D**2
+        dZin_dt = Z0 * (Z0 * D - ZL * N) / D**2
+
+    # Regra da cadeia: Z0 = sqrt(Z/Y), gamma = sqrt(ZY), t = tanh(gamma * l)
+    dZin_dgamma = dZin_dt * length * (1 - t**2)
+    dZin_dZ = (dZin_dZ0 * Z0 + dZin_dgamma * gamma) / (2 * Z)
+    dZin_dY = (-dZin_dZ0 * Z0 + dZin_dgamma * gamma) / (2 * Y)
+
+    J = np.column_stack((
+        dZin_dZ,                 # R_dc
+        dZin_dZ * 1j * omega,    # L
+        dZin_dY,                 # G
+        dZin_dY * 1j * omega,    # C
+        dZin_dZ * sqrt_f,        # k_skin
+    ))
+    return Zin, J
+
+
+def _to_params(u, scales):
+    """Variáveis de otimização -> parâmetros físicos (e dp/du)."""
+    p = np.empty(5)
+    dp = np.empty(5)
+    for i, name in enumerate(PARAM_NAMES):
+        if name in LOG_PARAMS:
+            p[i] = np.exp(u[i]); dp[i] = p[i]
+        else:
+            p[i] = u[i] * scales[i]; dp[i] = scales[i]
+    return p, dp
+
+
+def _to_u(p, scales):
+    u = np.empty(5)
+    for i, name in enumerate(PARAM_NAMES):
+        if name in LOG_PARAMS:
+            u[i] = np.log(max(p[i], np.finfo(float).tiny)) # Evita log(0) após underflow
+        else:
+            u[i] = p[i] / scales[i]
+    return u
+
+
+def levenberg_marquardt(freqs, Zin_meas, length, ZL, p0, free, max_iter=200, tol=1e-12):
+    """
+    Ajusta um único ponto inicial p0 (array na ordem de PARAM_NAMES).
+    free: máscara booleana dos parâmetros livres.
+    O resíduo é o erro relativo complexo (Zin - Zin_meas) / |Zin_meas|.
+    """
+    scales = np.array([LINEAR_SCALES.get(n, 1.0) for n in PARAM_NAMES])
+    weight = 1.0 / np.abs(Zin_meas)
+    linear = np.array([n not in LOG_PARAMS for n in PARAM_NAMES])
+
+    def evaluate(u):
+        p, dp = _to_params(u, scales)
+        Zin, J = zin_jacobian(p, freqs, length, ZL)
+        r = (Zin - Zin_meas) * weight
+        J = J[:, free] * (dp[free] * weight[:, None])
+        return p, np.concatenate((r.real, r.imag)), np.vstack((J.real, J.imag))
+
+    u = _to_u(p0, scales)
+    with np.errstate(all='ignore'):
+        p, r, J = evaluate(u)
+    cost = r @ r
+    lam = 1e-3
+    iterations = 0
+
+    for iterations in range(1, max_iter + 1):
+        JtJ = J.T @ J
+        g = J.T @ r
+        # Marquardt: amortecimento proporcional à diagonal (invariante à escala)
+        A = JtJ + lam * np.diag(np.diag(JtJ) + 1e-12)
+        try:
+            step = np.linalg.solve(A, -g)
+        except np.linalg.LinAlgError:
+            lam *= 10
+            continue
+
+        u_new = u.copy()
+        u_new[free] += step
+        u_new[linear] = np.maximum(u_new[linear], 0) # Projeção em >= 0
+        with np.errstate(all='ignore'):
+            p_new, r_new, J_new = evaluate(u_new)
+        cost_new = r_new @ r_new
+
+        if np.isfinite(cost_new) and cost_new < cost:
+            converged = cost - cost_new <= tol * max(cost, 1e-300)
+            u, p, r, J, cost = u_new, p_new, r_new, J_new, cost_new
+            lam = max(lam / 10, 1e-12)
+            if converged:
+                break
+        else:
+            lam *= 10
+            if lam > 1e12:
+                break
+
+    return {
+        "params": dict(zip(PARAM_NAMES, (float(v) for v in p))),
+        "cost": float(cost),
+        "rms_rel_error": float(np.sqrt(cost / len(freqs))),
+        "iterations": iterations,
+    }
+
+
+def fit_with_continuation(freqs, Zin_meas, length, ZL, p0, free):
+    """
+    Continuação em frequência: ajusta primeiro a parte baixa da varredura
+    (onde a linha é eletricamente curta e o custo tem poucos mínimos locais)
+    e dobra a banda a cada etapa, partindo do resultado anterior.
+    """
+    # Banda inicial: até ~1/4 de onda com o atraso do ponto inicial
+    delay = length * np.sqrt(p0[1] * p0[3])
+    f_band = 0.25 / delay
+    min_points = 5 * int(np.count_nonzero(free))
+    p = np.asarray(p0, dtype=float)
+    while True:
+        n = max(min_points, int(np.searchsorted(freqs, f_band, side='right')))
+        result = levenberg_marquardt(freqs[:n], Zin_meas[:n], length, _band(ZL, n), p, free)
+        if n >= len(freqs):
+            return result
+        p = np.array([result["params"][k] for k in PARAM_NAMES])
+        f_band *= 2
+
+
+def _band(ZL, n):
+    if ZL is None or np.ndim(ZL) == 0:
+        return ZL
+    return ZL[:n]
+
+
+def _initial_guesses(initial, n_starts, free, rng):
+    """Ponto nominal + partidas aleatórias (log-uniformes) em torno dele."""
+    p_nom = np.array([float(initial[n]) for n in PARAM_NAMES])
+    guesses = [p_nom]
+    for _ in range(n_starts - 1):
+        p = p_nom.copy()
+        for i, name in enumerate(PARAM_NAMES):
+            if not free[i]:
+                continue
+            if name in LOG_PARAMS:
+                p[i] = p_nom[i] * 10**rng.uniform(-0.5, 0.5)
+            else:
+                base = p_nom[i] if p_nom[i] > 0 else LINEAR_SCALES[name]
+                p[i] = base * 10**rng.uniform(-1, 1)
+        guesses.append(p)
+    return guesses
+
+
+def _run_start(job):
+    lot_index, freqs, Zin_meas, length, ZL, p0, free = job
+    return lot_index, fit_with_continuation(freqs, Zin_meas, length, ZL, p0, free)
+
+
+def _prepare_lot(lot):
+    freqs = np.asarray(lot["freqs"], dtype=float)
+    if np.any(freqs <= 0):
+        raise ValueError("O ajuste exige frequências positivas (sem o ponto DC)")
+    if "Zin" in lot:
+        Zin = np.asarray(lot["Zin"], dtype=complex)
+    else:
+        Zin = zin_from_s11(np.asarray(lot["S11"], dtype=complex), lot.get("Z_ref", 50.0))
+    return freqs, Zin, float(lot["length"]), lot.get("ZL")
+
+
+def fit_cable_lots(lots, initial=None, n_starts=8, free=PARAM_NAMES, seed=0, workers=None):
+    """
+    Ajusta R_dc, L, G, C e k_skin para cada lote medido.
+
+    lots: lista de dicts com "freqs", "length", "ZL" (None = aberto) e
+          "Zin" ou "S11" (+ "Z_ref", padrão 50 Ω)
+    initial: parâmetros nominais (dict como os de CABLE_LIBRARY)
+    free: parâmetros ajustados; os demais ficam fixos no valor inicial
+    workers: processos do pool (1 = execução serial, sem pool)
+    Retorna: lista de resultados (melhor partida de cada lote), na ordem dos lotes
+    """
+    initial = initial or CABLE_LIBRARY["Personalizado"]
+    free_mask = np.array([n in free for n in PARAM_NAMES])
+    for name in LOG_PARAMS:
+        if initial[name] <= 0:
+            raise ValueError(f"O valor inicial de {name} deve ser positivo")
+    rng = np.random.default_rng(seed)
+
+    jobs = []
+    for lot_index, lot in enumerate(lots):
+        freqs, Zin, length, ZL = _prepare_lot(lot)
+        for p0 in _initial_guesses(initial, n_starts, free_mask, rng):
+            jobs.append((lot_index, freqs, Zin, length, ZL, p0, free_mask))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        outcomes = map(_run_start, jobs)
+        return _best_per_lot(outcomes, len(lots))
+    chunksize = max(1, len(jobs) // (workers * 4))
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        return _best_per_lot(pool.map(_run_start, jobs, chunksize=chunksize), len(lots))
+
+
+def _best_per_lot(outcomes, n_lots):
+    best = [None] * n_lots
+    for lot_index, result in outcomes:
+        current = best[lot_index]
+        if current is None:
+            best[lot_index] = result
+        elif np.isfinite(result["cost"]) and (not np.isfinite(current["cost"])
+                                              or result["cost"] < current["cost"]):
+            # Partidas divergentes (custo NaN/inf) nunca substituem um ajuste finito
+            best[lot_index] = result
+    return best
+
+
+def fit_line_parameters(freqs, Zin_meas, length, ZL=None, initial=None, n_starts=8,
+                        free=PARAM_NAMES, seed=0, workers=1):
+    """Atalho para ajustar uma única medição de Zin(f). Retorna o resultado da melhor partida."""
+    lot = {"freqs": freqs, "Zin": Zin_meas, "length": length, "ZL": ZL}
+    return fit_cable_lots([lot], initial, n_starts, free, seed, workers)[0]
+
+
+def add_fitted_cable(name, result):
+    """Adiciona um cabo ajustado à CABLE_LIBRARY."""
+    add_cable(name, result["params"])
+
+
+def _parse_load(text):
+    if text == "open":
+        return None
+    if text == "short":
+        return 0.0
+    return complex(text.replace(" ", ""))
+
+
+def main(argv=None):
+    from faultLocator import read_touchstone
+
+    parser = argparse.ArgumentParser(description="Ajuste de RLGC/efeito pelicular a partir de medições Touchstone.")
+    parser.add_argument("files", nargs="+", help="Arquivos .s1p/.s2p (S11 de cada lote)")
+    parser.add_argument("--length", type=float, required=True, help="Comprimento do cabo medido (m)")
+    parser.add_argument("--load", default="open", help="Terminação: open, short ou impedância (ex.: 50, 50+10j)")
+    parser.add_argument("--cable", default="Personalizado", help="Cabo da biblioteca usado como valor inicial")
+    parser.add_argument("--starts", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="cabos_ajustados.json", help="Arquivo JSON de saída")
+    args = parser.parse_args(argv)
+
+    ZL = _parse_load(args.load)
+    lots = []
+    for path in args.files:
+        freqs, S11, z_ref = read_touchstone(path)
+        keep = freqs > 0
+        lots.append({"freqs": freqs[keep], "S11": S11[keep], "Z_ref": z_ref, "length": args.length, "ZL": ZL})
+
+    results = fit_cable_lots(lots, CABLE_LIBRARY[args.cable], args.starts, workers=args.workers)
+    names = []
+    for path, result in zip(args.files, results):
+        name = os.path.splitext(os.path.basename(path))[0]
+        add_fitted_cable(name, result)
+        names.append(name)
+        print(f"{name}: erro RMS relativo {result['rms_rel_error']:.2e} | "
+              + ", ".join(f"{k}={v:.4g}" for k, v in result["params"].items()))
+    save_cables(args.out, names)
+    print(f"{len(names)} cabos salvos em {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,26 @@
 import numpy as np
 
+def load_impedance(load_type, freqs, zl_const=0j, rlc_params=None):
+    """
+    Impedância da carga Z_L(f) para os tipos suportados pela interface:
+    "Constante (Z)", "RLC Série" ou "RLC Paralelo".
+    rlc_params: dict com chaves "R", "L", "C" (usado apenas nos tipos RLC)
+    """
+    omega = 2 * np.pi * freqs
+    if load_type == "Constante (Z)":
+        return np.full_like(freqs, zl_const, dtype=complex)
+    elif load_type == "RLC Série":
+        R, L, C = rlc_params["R"], rlc_params["L"], rlc_params["C"]
+        Xc = np.divide(1.0, (omega * C), out=np.zeros_like(omega), where=omega!=0)
+        return R + 1j * (omega * L - Xc)
+    elif load_type == "RLC Paralelo":
+        R, L, C = rlc_params["R"], rlc_params["L"], rlc_params["C"]
+        G = 1.0 / R
+        Bl = np.divide(1.0, (omega * L), out=np.zeros_like(omega), where=omega!=0)
+        Bc = omega * C
+        Y = G + 1j * (Bc - Bl)
+        return np.divide(1.0, Y, out=np.full_like(Y, 1e9), where=Y!=0)
+
 class AdvancedTransmissionLine:
     def __init__(self, R_dc, L_inf, G, C_inf, length, skin_factor=0):
         """
@@ -45,6 +66,29 @@ class AdvancedTransmissionLine:
             
         return Z0, gamma
 
+    def compute_zin(self, frequencies, ZL):
+        """
+        Impedância de entrada Zin(f) da linha terminada em ZL (escalar ou array).
+        Retorna: Z0, gamma, Zin
+        """
+        Z0, gamma = self.compute_params(frequencies)
+        term = np.tanh(gamma * self.len)
+        Zin = Z0 * (ZL + Z0 * term) / (Z0 + ZL * term)
+        return Z0, gamma, Zin
+
+    def compute_transfer(self, frequencies, ZL, Z_source):
+        """
+        Função de transferência H(f) = V_carga / V_fonte da linha alimentada
+        por uma fonte de impedância Z_source e terminada em ZL.
+        Retorna: H
+        """
+        Z0, gamma, Zin = self.compute_zin(frequencies, ZL)
+        Gamma_L = (ZL - Z0) / (ZL + Z0)
+        # V_L / V_in = (1 + Γ_L) / (e^{γl} + Γ_L e^{-γl}), escrito só com e^{-γl}
+        # para não estourar em linhas longas/com perdas
+        e = np.exp(-gamma * self.len)
+        return Zin / (Zin + Z_source) * (1 + Gamma_L) * e / (1 + Gamma_L * e**2)
+
     def get_tdr_response(self, V_source_mag, Z_source, Z_load_func, t_max=100e-9, points=1024):
         """
         Simula a TDR injetando um DEGRAU.
@@ -0,0 +1,81 @@
+import numpy as np
+
+# Funções de desenho compartilhadas entre a interface (main.py) e a
+# exportação headless (exportPipeline.py). Recebem apenas eixos do
+# matplotlib, então funcionam com qualquer backend (QtAgg, Agg, SVG, PDF).
+
+def plot_standing_wave(ax, length, freq, gamma, Gamma_L):
+    """Plota |V| ao longo da linha (onda estacionária)."""
+    x = np.linspace(0, length, 200)
+    d = length - x
+    V_d = np.exp(gamma * d) + Gamma_L * np.exp(-gamma * d)
+    
+    ax.clear()
+    ax.plot(x, np.abs(V_d), color='#0055aa', linewidth=2)
+    ax.set_title(f"Tensão ao longo da linha (f={freq/1e6:.0f} MHz)")
+    ax.set_xlabel("Distância da Fonte (m)")
+    ax.set_ylabel("|V| Normalizado")
+    ax.grid(True, linestyle='--', alpha=0.5)
+
+def plot_smith_trajectory(ax, length, gamma, Gamma_L):
+    """
+    Desenha a trajetória de Γ(d) sobre uma grade de Smith já existente.
+    Retorna a lista de artistas criados, para que possam ser removidos
+    sem redesenhar a grade (ver remove_artists).
+    """
+    dist_sweep = np.linspace(0, length, 100)
+    Gamma_d = Gamma_L * np.exp(-2 * gamma * dist_sweep)
+    artists = []
+    artists += ax.plot(Gamma_d.real, Gamma_d.imag, 'r-', lw=2, label='Trajetória')
+    artists += ax.plot(Gamma_d[0].real, Gamma_d[0].imag, 'go', label='Carga')
+    artists += ax.plot(Gamma_d[-1].real, Gamma_d[-1].imag, 'bo', label='Entrada')
+    artists.append(ax.legend(fontsize='small'))
+    return artists
+
+def plot_frequency_sweep(ax_mag, ax_phase, freqs, Zin_vec, current_freq):
+    """Plota módulo e fase de Zin(f) na varredura de frequência."""
+    mag = np.abs(Zin_vec)
+    phase = np.angle(Zin_vec, deg=True)
+    
+    ax_mag.clear()
+    ax_mag.plot(freqs/1e6, mag, 'k-', lw=1.5)
+    ax_mag.set_ylabel("|Zin| (Ω)")
+    ax_mag.grid(True, alpha=0.5)
+    
+    ax_phase.clear()
+    ax_phase.plot(freqs/1e6, phase, 'r-', lw=1.5)
+    ax_phase.set_ylabel("Fase (°)")
+    ax_phase.set_xlabel("Freq (MHz)")
+    ax_phase.grid(True, alpha=0.5)
+    
+    ax_mag.axvline(current_freq/1e6, color='b', linestyle='--')
+
+def remove_artists(artists):
+    for artist in artists:
+        artist.remove()
+
+def plot_distance_to_fault(ax, distances, mag, line_end=None):
+    """Plota |Γ(d)| da análise de distância até a falha (DTF)."""
+    ax.clear()
+    ax.plot(distances, mag, color='#0055aa', lw=1.5)
+    if line_end is not None:
+        ax.axvline(line_end, color='r', linestyle='--', label='Fim da linha')
+        ax.legend(fontsize='small')
+    ax.set_title("Distância até a Falha (DTF)")
+    ax.set_xlabel("Distância (m)")
+    ax.set_ylabel("|Γ(d)|")
+    ax.grid(True, linestyle='--', alpha=0.5)
+
+def plot_eye_diagram(ax, eye):
+    """Plota o histograma acumulado do diagrama de olho (channelSimulation.EyeDiagram)."""
+    ax.clear()
+    t = eye.times() * 1e12
+    v = eye.voltages()
+    density = np.log10(1 + eye.histogram.T) # Escala log: realça trajetórias raras
+    ax.imshow(density, origin='lower', aspect='auto', cmap='inferno',
+              extent=(t[0], t[-1] + (t[1] - t[0]), v[0], v[-1]))
+    height, _ = eye.eye_height()
+    ax.set_title(f"Diagrama de Olho ({eye.n_bits} bits) | "
+                 f"altura {height*1e3:.0f} mV | largura {eye.eye_width()*1e12:.0f} ps")
+    ax.set_xlabel("Tempo (ps)")
+    ax.set_ylabel("Tensão (V)")
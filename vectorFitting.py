@@ -0,0 +1,420 @@
+"""
+Macromodelos racionais (polos e resíduos) das respostas da linha por
+Vector Fitting, para reuso barato no domínio do tempo.
+
+    H(s) ≈ sum_k r_k / (s - p_k) + d
+
+Depois de ajustado, o modelo dá respostas temporais por convolução
+recursiva (custo O(polos) por passo de tempo), sem refazer FFTs nem
+reavaliar compute_params. Os modelos ficam em cache por cabo/comprimento/
+carga, então transientes repetidos na mesma linha não refazem o ajuste.
+Modelos fora da tolerância (erro de ajuste, limite de polos ou
+passividade) levantam ValueError em vez de entrar no cache.
+
+Tipos de resposta:
+    "zin"      : impedância de entrada Zin(f)
+    "input"    : V_entrada / V_fonte = Zin / (Zin + Z_source)   (TDR)
+    "transfer" : V_carga / V_fonte (compute_transfer)
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+from physicsEngine import load_impedance
+
+KINDS = ("zin", "input", "transfer")
+CACHE_SIZE = 64
+MAX_POLES = 300
+RMS_TOLERANCE = 1e-2 # Erro relativo RMS máximo aceito para o cache
+_model_cache = OrderedDict()
+
+
+class RationalModel:
+    """Modelo polo-resíduo de uma resposta em frequência (polos em rad/s)."""
+
+    def __init__(self, poles, residues, d, kind="zin"):
+        self.poles = np.asarray(poles, dtype=complex)
+        self.residues = np.asarray(residues, dtype=complex)
+        self.d = float(d)
+        self.kind = kind
+        self.rms_error = None
+        self.passive = None
+        self.passivity_violation = 0.0
+
+    def __len__(self):
+        return len(self.poles)
+
+    def evaluate(self, freqs):
+        """Resposta do modelo em frequência."""
+        s = 2j * np.pi * np.asarray(freqs, dtype=float)
+        return (self.residues / (s[:, None] - self.poles)).sum(axis=1) + self.d
+
+    def impulse_response(self, t):
+        """Parte regular h(t) = sum r e^{pt} (sem o termo d*delta)."""
+        t = np.asarray(t, dtype=float)
+        h = np.real((self.residues * np.exp(np.outer(np.maximum(t, 0), self.poles))).sum(axis=1))
+        return np.where(t >= 0, h, 0.0)
+
+    def simulate(self, u, dt):
+        """
+        Resposta y[n] à entrada amostrada u[n] (passo dt) por convolução
+        recursiva. Entre amostras u é linear, e a recursão de cada polo é
+        exata para essa entrada:
+            x[n] = e^{p dt} x[n-1] + r (c0 u[n-1] + c1 u[n])
+        """
+        u = np.asarray(u, dtype=float)
+        # Pares conjugados: basta o polo de Im > 0 (vezes 2, parte real)
+        upper = self.poles.imag >= 0
+        p = self.poles[upper]
+        r = self.residues[upper] * np.where(p.imag > 0, 2.0, 1.0)
+
+        alpha = np.exp(p * dt)
+        I0 = (alpha - 1) / p
+        I1 = -dt / p + (alpha - 1) / p**2
+        c1 = r * I1 / dt
+        c0 = r * (I0 - I1 / dt)
+
+        return _recursive_sum(alpha, c0, c1, u) + self.d * u
+
+    def step_response(self, t_max, dt):
+        """Resposta ao degrau unitário. Retorna: t, y"""
+        t = np.arange(0, t_max, dt)
+        return t, self.simulate(np.ones_like(t), dt)
+
+
+def _recursive_sum(alpha, c0, c1, u, block=256):
+    """
+    y[n] = Re sum_p x_p[n], com x[n] = alpha x[n-1] + c0 u[n-1] + c1 u[n],
+    em blocos de 'block' amostras: x[n0+k] = alpha^{k+1} x[n0-1] +
+    alpha^k * cumsum(f alpha^{-i}). Entre blocos passa só x[n0-1] (um valor
+    por polo), então a memória não cresce com len(u).
+    Polos rápidos demais para o bloco (alpha^{-block} estouraria) usam a
+    soma truncada direta, já que alpha^k some em poucas amostras.
+    """
+    n_t = len(u)
+    y = np.empty(n_t)
+    decay = -np.log(np.abs(alpha)) # |Re p| dt
+    slow = decay * block < 600
+    fast = ~slow
+
+    k = np.arange(block)[:, None]
+    a = alpha[slow]
+    pw0 = a ** k
+    pw1 = pw0 * a
+    inv = a ** (-k)
+    a_f = alpha[fast]
+    pw1_f = a_f ** (k + 1)
+    n_taps = int(np.ceil(37 / decay[fast].min())) + 1 if fast.any() else 0 # alpha^n_taps < 1e-16
+    taps = a_f ** np.arange(n_taps)[:, None]
+
+    x_prev = np.zeros(len(alpha), dtype=complex)
+    u_last = 0.0
+    for start in range(0, n_t, block):
+        ub = u[start:start+block]
+        nb = len(ub)
+        fb = np.outer(np.concatenate(([u_last], ub[:-1])), c0) + np.outer(ub, c1)
+        xb = np.empty_like(fb)
+        xb[:, slow] = pw0[:nb] * np.cumsum(fb[:, slow] * inv[:nb], axis=0) + pw1[:nb] * x_prev[slow]
+        if fast.any():
+            ff = fb[:, fast]
+            xf = pw1_f[:nb] * x_prev[fast]
+            for j in range(min(n_taps, nb)):
+                xf[j:] += taps[j] * ff[:nb-j]
+            xb[:, fast] = xf
+        x_prev = xb[-1]
+        u_last = ub[-1]
+        y[start:start+nb] = xb.real.sum(axis=1)
+    return y
+
+
+def _basis(s, poles):
+    """
+    Base real para polos reais e pares conjugados:
+    par (p, p*) -> 1/(s-p) + 1/(s-p*)  e  j/(s-p) - j/(s-p*)
+    """
+    cols = []
+    for p in poles:
+        if p.imag == 0:
+            cols.append(1 / (s - p.real))
+        else:
+            a, b = 1 / (s - p), 1 / (s - np.conj(p))
+            cols.append(a + b)
+            cols.append(1j * a - 1j * b)
+    return np.column_stack(cols)
+
+
+def _real_lstsq(A, b, weight):
+    A = A * weight[:, None]
+    b = b * weight
+    A_r = np.vstack((A.real, A.imag))
+    b_r = np.concatenate((b.real, b.imag))
+    # Normalização das colunas melhora o condicionamento
+    norms = np.linalg.norm(A_r, axis=0)
+    norms[norms == 0] = 1
+    x = np.linalg.lstsq(A_r / norms, b_r, rcond=None)[0]
+    return x / norms
+
+
+def _initial_poles(freqs, n_poles):
+    """Pares complexos com Im distribuída na banda e amortecimento leve."""
+    beta = 2 * np.pi * np.linspace(freqs[0], freqs[-1], n_poles // 2)
+    beta = np.maximum(beta, 2 * np.pi * freqs[-1] * 1e-3)
+    return -beta / 100 + 1j * beta
+
+
+def vector_fit(freqs, H, n_poles, iterations=10, relative=True):
+    """
+    Ajusta H(j2πf) por Vector Fitting (realocação de polos + resíduos).
+    n_poles deve ser par (pares conjugados). Polos instáveis são refletidos
+    para o semiplano esquerdo a cada iteração.
+    Retorna: RationalModel
+    """
+    freqs = np.asarray(freqs, dtype=float)
+    H = np.asarray(H, dtype=complex)
+    s = 2j * np.pi * freqs
+    weight = 1 / np.maximum(np.abs(H), 1e-12 * np.max(np.abs(H))) if relative else np.ones(len(H))
+    poles = _initial_poles(freqs, n_poles)
+
+    for _ in range(iterations):
+        # sigma(s) H(s) ≈ (sum c φ + d), com sigma(s) = 1 + sum c~ φ
+        Phi = _basis(s, poles)
+        n = Phi.shape[1]
+        A = np.hstack((Phi, np.ones((len(s), 1)), -H[:, None] * Phi))
+        x = _real_lstsq(A, H, weight)
+        c_sigma = x[n+1:]
+
+        # Zeros de sigma = autovalores de (Ap - b c~^T) na forma real
+        Ap = np.zeros((n, n)); b = np.zeros(n)
+        i = 0
+        for p in poles:
+            if p.imag == 0:
+                Ap[i, i] = p.real; b[i] = 1; i += 1
+            else:
+                Ap[i:i+2, i:i+2] = [[p.real, p.imag], [-p.imag, p.real]]
+                b[i] = 2; i += 2
+        zeros = np.linalg.eigvals(Ap - np.outer(b, c_sigma))
+        zeros = np.where(zeros.real > 0, -np.conj(zeros), zeros)
+        poles = _pole_representatives(zeros)
+
+    # Identificação final dos resíduos com os polos fixos
+    model = _fit_residues(freqs, H, weight, poles)
+    fit = model.evaluate(freqs)
+    model.rms_error = float(np.sqrt(np.mean(np.abs((fit - H) * weight)**2)))
+    return model
+
+
+def _fit_residues(freqs, H, weight, poles, d=None):
+    """
+    Resíduos e d por mínimos quadrados, com os polos (representantes) fixos.
+    d: se dado, o termo constante fica fixo nesse valor.
+    """
+    s = 2j * np.pi * freqs
+    Phi = _basis(s, poles)
+    if d is None:
+        x = _real_lstsq(np.hstack((Phi, np.ones((len(s), 1)))), H, weight)
+    else:
+        x = np.append(_real_lstsq(Phi, H - d, weight), d)
+    full_poles, residues = [], []
+    i = 0
+    for p in poles:
+        if p.imag == 0:
+            full_poles.append(p.real); residues.append(x[i]); i += 1
+        else:
+            r = x[i] + 1j * x[i+1]
+            full_poles += [p, np.conj(p)]; residues += [r, np.conj(r)]
+            i += 2
+    return RationalModel(full_poles, residues, x[-1])
+
+
+def _pole_representatives(eig):
+    """Polos reais + um representante (Im > 0) de cada par conjugado."""
+    tol = 1e-9 * np.maximum(np.abs(eig), 1)
+    real = eig[np.abs(eig.imag) <= tol].real
+    upper = eig[eig.imag > tol]
+    return np.concatenate((real.astype(complex), upper))
+
+
+def _passivity_targets(model, freqs, load_admittance=None, Z_source=50.0):
+    """
+    Pontos que violam a passividade, quanto violam e o valor passivo mais
+    próximo para usar como alvo no reajuste dos resíduos.
+    Retorna: máscara, violação (por ponto violado), alvos
+    """
+    H = model.evaluate(freqs)
+    if model.kind == "zin":
+        excess = -H.real
+        margin = 1e-4 * np.max(np.abs(H))
+        target = lambda Hv: margin + 1j * Hv.imag
+    else:
+        if model.kind == "input":
+            bound = np.ones(len(freqs))
+        elif load_admittance is None:
+            bound = np.full(len(freqs), np.inf)
+        else:
+            with np.errstate(divide='ignore'):
+                bound = 1 / np.sqrt(4 * np.real(Z_source) * np.maximum(np.real(load_admittance(freqs)), 0))
+        excess = np.abs(H) - bound
+        target = lambda Hv: Hv * (bound[mask] / np.abs(Hv)) * (1 - 1e-3)
+    mask = excess > 0
+    return mask, excess[mask], target(H[mask])
+
+
+def check_passivity(model, f_max, load_admittance=None, Z_source=50.0, points=20000):
+    """
+    Verifica a passividade do modelo numa grade densa de 0 a 10 * f_max.
+    "zin":      Re Zin(jω) >= 0 (real-positiva)
+    "input":    |V_in / V_fonte| <= 1  (Re Zin >= 0 e Z_source resistiva)
+    "transfer": |V_L / V_fonte|^2 <= 1 / (4 Re(Z_s) Re(Y_L)) (potência
+                entregue à carga <= potência disponível da fonte)
+    Retorna: (passivo, violação máxima)
+    """
+    freqs = np.linspace(0, 10 * f_max, points)
+    mask, excess, _ = _passivity_targets(model, freqs, load_admittance, Z_source)
+    violation = float(np.max(excess)) if mask.any() else 0.0
+    return violation == 0.0, violation
+
+
+def enforce_passivity(model, freqs, H, f_max, load_admittance=None, Z_source=50.0,
+                      max_iter=10, points=20000):
+    """
+    Correção por perturbação dos resíduos (polos fixos):
+    1. o termo d (valor em f -> inf) é trazido para dentro do limite passivo;
+    2. os pontos que ainda violam entram no ajuste com alvos passivos, e os
+       resíduos são reajustados (d fixo) até o modelo passar na verificação.
+    freqs, H: dados usados no ajuste
+    Ao final, passive e passivity_violation refletem o modelo corrigido.
+    """
+    grid = np.linspace(0, 10 * f_max, points)
+    weight = 1 / np.maximum(np.abs(H), 1e-12 * np.max(np.abs(H)))
+    poles = _pole_representatives(model.poles)
+    passive, _ = check_passivity(model, f_max, load_admittance, Z_source, points)
+
+    if not passive:
+        # Limite passivo de d, avaliado no fim da grade (~ f -> inf)
+        probe = RationalModel([], [], model.d, model.kind)
+        mask, _, target = _passivity_targets(probe, grid[-1:], load_admittance, Z_source)
+        if mask.any():
+            d = float(target[0].real)
+            refit = _fit_residues(freqs, H, weight, poles, d)
+            model.residues, model.d = refit.residues, refit.d
+
+    f_fit, H_fit, w_fit = freqs, H, weight
+    for it in range(max_iter):
+        mask, _, target = _passivity_targets(model, grid, load_admittance, Z_source)
+        if not mask.any():
+            break
+        # Violações persistentes ganham peso crescente a cada iteração
+        f_fit = np.concatenate((f_fit, grid[mask]))
+        H_fit = np.concatenate((H_fit, target))
+        w_fit = np.concatenate((w_fit, 2.0**it / np.maximum(np.abs(target), 1e-12 * np.max(np.abs(H)))))
+        refit = _fit_residues(f_fit, H_fit, w_fit, poles, model.d)
+        model.residues = refit.residues
+
+    model.passive, model.passivity_violation = check_passivity(model, f_max, load_admittance,
+                                                               Z_source, points)
+    model.rms_error = float(np.sqrt(np.mean(np.abs((model.evaluate(freqs) - H) * weight)**2)))
+    return model
+
+
+def line_response(line, freqs, kind, ZL, Z_source=50.0):
+    """Resposta em frequência exata (AdvancedTransmissionLine) do tipo pedido."""
+    if kind == "zin":
+        return line.compute_zin(freqs, ZL)[2]
+    if kind == "input":
+        Zin = line.compute_zin(freqs, ZL)[2]
+        return Zin / (Zin + Z_source)
+    if kind == "transfer":
+        return line.compute_transfer(freqs, ZL, Z_source)
+    raise ValueError(f"Tipo de resposta desconhecido: {kind} (use {', '.join(KINDS)})")
+
+
+def default_pole_count(line, f_max):
+    """Polos suficientes para ~2 por ressonância da linha na banda (sem limite)."""
+    delay = line.len * np.sqrt(line.L * line.C)
+    return int(2 * np.ceil(2 * f_max * delay) + 8)
+
+
+def max_model_band(line):
+    """Maior f_max cujo default_pole_count cabe em MAX_POLES (Hz)."""
+    delay = line.len * np.sqrt(line.L * line.C)
+    if delay == 0:
+        return np.inf
+    # Inverso de default_pole_count, com folga para o arredondamento do ceil
+    return (MAX_POLES - 8) // 2 / (2 * delay) * (1 - 1e-9)
+
+
+def line_model(line, f_max, kind="zin", load_type="Constante (Z)", zl_const=0j, rlc_params=None,
+               Z_source=50.0, n_poles=None, iterations=10):
+    """
+    Macromodelo em cache da linha (cabo + comprimento + carga + tipo).
+    A primeira chamada ajusta o modelo; as seguintes devolvem o mesmo objeto.
+    Obs.: uma carga "Constante (Z)" com parte imaginária não é realizável
+    (Z(-jω) != Z(jω)*), então o modelo real só a aproxima; cargas
+    resistivas e RLC são ajustadas normalmente.
+    Levanta ValueError se a banda exigir mais de MAX_POLES polos, se o erro
+    RMS relativo passar de RMS_TOLERANCE ou se o modelo não ficar passivo.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Tipo de resposta desconhecido: {kind} (use {', '.join(KINDS)})")
+    n_poles = n_poles or default_pole_count(line, f_max)
+    n_poles += n_poles % 2
+    if n_poles > MAX_POLES:
+        raise ValueError(f"A banda pede {n_poles} polos (máximo {MAX_POLES}); "
+                         f"reduza f_max ou o comprimento da linha")
+    rlc_key = tuple(sorted(rlc_params.items())) if rlc_params else None
+    key = (line.R_dc, line.L, line.G, line.C, line.k_skin, line.len, kind,
+           load_type, complex(zl_const), rlc_key, complex(Z_source), f_max, n_poles)
+    if key in _model_cache:
+        _model_cache.move_to_end(key)
+        return _model_cache[key]
+
+    # Grade linear (as ressonâncias da linha são igualmente espaçadas) mais
+    # alguns pontos logarítmicos abaixo dela, que ancoram o valor em DC
+    n_freq = max(400, 20 * n_poles)
+    freqs = np.linspace(f_max / n_freq, f_max, n_freq)
+    freqs = np.concatenate((np.logspace(np.log10(f_max * 1e-6), np.log10(freqs[0]), 11)[:-1], freqs))
+    ZL = load_impedance(load_type, freqs, zl_const, rlc_params)
+    H = line_response(line, freqs, kind, ZL, Z_source)
+
+    # A resposta é ajustada inteira, inclusive o atraso de ida: com carga
+    # descasada o ripple das idas e voltas (e^{-2γl}) domina, e extrair só o
+    # atraso puro deixa um resto que o ajuste não acompanha
+    model = vector_fit(freqs, H, n_poles, iterations)
+    model.kind = kind
+
+    def load_admittance(f):
+        # Evita o tratamento especial de DC em load_impedance (limite f -> 0)
+        f = np.maximum(f, f_max * 1e-9)
+        with np.errstate(divide='ignore'):
+            return 1 / load_impedance(load_type, f, zl_const, rlc_params)
+    enforce_passivity(model, freqs, H, f_max, load_admittance, Z_source)
+    if model.rms_error > RMS_TOLERANCE:
+        raise ValueError(f"Ajuste com erro RMS relativo de {model.rms_error:.2%} "
+                         f"(tolerância {RMS_TOLERANCE:.2%}) usando {n_poles} polos")
+    if not model.passive:
+        raise ValueError(f"Não foi possível tornar o modelo passivo "
+                         f"(violação restante {model.passivity_violation:.3g})")
+
+    _model_cache[key] = model
+    if len(_model_cache) > CACHE_SIZE:
+        _model_cache.popitem(last=False)
+    return model
+
+
+def line_step_response(line, t_max, dt, kind="input", f_max=None, **load):
+    """
+    Resposta ao degrau da linha pelo macromodelo em cache (TDR com
+    kind="input"). f_max padrão: 1 / (20 dt) (20 amostras por período na
+    maior frequência ajustada), reduzido para max_model_band(line) em linhas
+    longas. Nesse caso o degrau sai limitado em banda, com tempo de subida
+    da ordem de 0.35 / f_max, mesmo que dt seja menor.
+    load: load_type, zl_const, rlc_params, Z_source (como em line_model)
+    Retorna: t, y
+    """
+    f_max = f_max or min(1 / (20 * dt), max_model_band(line))
+    model = line_model(line, f_max, kind, **load)
+    return model.step_response(t_max, dt)
+
+
+def clear_model_cache():
+    _model_cache.clear()